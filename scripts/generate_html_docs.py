@@ -3,212 +3,311 @@
 将 Markdown 文档转换为 HTML 格式
 """
 
+import hashlib
+import io
+import mmap
 import re
 import os
+from itertools import islice
 from pathlib import Path
 
+# 可选依赖：安装了 google-re2 时，行内正则改用 RE2 编译。
+# RE2 基于自动机、匹配时间与输入长度成线性关系，不会出现
+# '***...' 之类输入引发的回溯爆炸；未安装时回退到标准库 re。
+try:
+    import re2 as _inline_re
+except ImportError:
+    _inline_re = re
+
+# 可选依赖：安装了 mistune (>= 3) 时，用它完成整篇 Markdown 的解析，
+# 覆盖 CommonMark 的各种边界情况；未安装时使用下方内置的简易解析器。
+try:
+    import mistune
+except ImportError:
+    mistune = None
+else:
+    if int(mistune.__version__.split('.')[0]) < 3:
+        mistune = None
+
+# 预编译正则表达式，避免每行重复查找 re 缓存
+_RE_HEADING = re.compile(r'^#+')
+_RE_TABLE_SEP = re.compile(r'^[-:]+$')
+_RE_TAG = re.compile(r'<[^>]+>')
+
+# 行内格式合并为一个交替正则，单次扫描完成替换；
+# 图片须在链接之前、粗斜体须在粗体之前、粗体须在斜体之前，保证同一位置优先匹配较长的标记。
+# 斜体内容整体跳过完整的 **…** / __…__，否则会在内层粗体的第一个标记处提前结束
+_RE_INLINE = _inline_re.compile(
+    r'(?P<img>!\[([^\]]*)\]\(([^)]+)\))'
+    r'|(?P<link>\[([^\]]+)\]\(([^)]+)\))'
+    r'|(?P<code>`([^`]+)`)'
+    r'|(?P<strong_em_star>\*\*\*(.+?)\*\*\*)'
+    r'|(?P<strong_em_under>___(.+?)___)'
+    r'|(?P<bold_star>\*\*(.+?)\*\*)'
+    r'|(?P<bold_under>__(.+?)__)'
+    r'|(?P<em_star>\*((?:\*\*.+?\*\*|[^*])+)\*)'
+    r'|(?P<em_under>_((?:__.+?__|[^_])+)_)'
+)
+
+class _AnchorTable(dict):
+    """锚点字符映射表：按需计算并缓存每个字符的处理结果
+
+    与 re.sub(r'[^\\w\\s-]', '', ...).replace(' ', '-') 等价：
+    空格转为 '-'，单词字符、空白和 '-' 保留，其余字符删除。
+    """
+
+    def __missing__(self, code):
+        ch = chr(code)
+        if ch == ' ':
+            value = '-'
+        elif ch.isalnum() or ch in '_-' or ch.isspace():
+            value = code
+        else:
+            value = None
+        self[code] = value
+        return value
+
+_ANCHOR_TABLE = _AnchorTable()
+
+def make_anchor(text):
+    """根据标题文本生成锚点 ID"""
+    return text.lower().translate(_ANCHOR_TABLE)
+
 def escape_html(text):
     """转义 HTML 特殊字符"""
     return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
 
-def markdown_to_html(md_content):
-    """简单的 Markdown 到 HTML 转换"""
-    lines = md_content.split('\n')
-    html_lines = []
+def _markdown_to_html_builtin(md_content, toc=None):
+    """简单的 Markdown 到 HTML 转换（内置解析器）
+
+    逐行单遍处理：先按行首字符分派到对应的块类型，
+    只有在字符初筛命中后才进行正则匹配。
+    """
+    buf = io.StringIO()
+    # 循环内频繁调用的函数绑定为局部变量，省去每次的全局/属性查找
+    emit = buf.write
+    inline = inline_format
+    escape = escape_html
+    match_heading = _RE_HEADING.match
+    match_table_sep = _RE_TABLE_SEP.match
+    # 同名标题只计算一次锚点
+    anchors = {}
     in_code_block = False
     code_lang = ""
+    code_lines = []
     in_table = False
+    in_thead = False
     in_list = False
     list_type = None
     
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        
+    for line in md_content.split('\n'):
         # 代码块处理
         if line.startswith('```'):
             if not in_code_block:
+                if in_table:
+                    in_table = False
+                    emit('</tbody>\n</table>\n')
+                if in_list:
+                    in_list = False
+                    emit(f'</{list_type}>\n')
                 in_code_block = True
                 code_lang = line[3:].strip()
                 lang_class = f' class="language-{code_lang}"' if code_lang else ''
-                html_lines.append(f'<pre><code{lang_class}>')
+                emit(f'<pre><code{lang_class}>\n')
             else:
                 in_code_block = False
-                html_lines.append('</code></pre>')
-            i += 1
+                # 整块内容拼接后一次转义
+                if code_lines:
+                    emit(escape('\n'.join(code_lines) + '\n'))
+                    code_lines = []
+                emit('</code></pre>\n')
             continue
         
         if in_code_block:
-            html_lines.append(escape_html(line))
-            i += 1
+            code_lines.append(line)
             continue
         
+        stripped = line.strip()
+        c = stripped[:1]
+        
         # 表格处理
-        if '|' in line and line.strip().startswith('|'):
+        if c == '|':
             if not in_table:
                 in_table = True
-                html_lines.append('<table class="table">')
-                html_lines.append('<thead>')
+                in_thead = True
+                emit('<table class="table">\n<thead>\n')
             
-            cells = [c.strip() for c in line.split('|')[1:-1]]
+            # 首尾两段是行首/行尾 '|' 之外的内容，直接跳过而不切片复制
+            parts = line.split('|')
+            cells = [cell.strip() for cell in islice(parts, 1, len(parts) - 1)]
             
             # 检查是否是分隔行
-            if all(re.match(r'^[-:]+$', c) for c in cells):
-                html_lines.append('</thead>')
-                html_lines.append('<tbody>')
-                i += 1
+            if all(match_table_sep(cell) for cell in cells):
+                emit('</thead>\n<tbody>\n')
+                in_thead = False
                 continue
             
-            row_tag = 'th' if '</thead>' not in '\n'.join(html_lines[-5:]) else 'td'
-            html_lines.append('<tr>')
+            row_tag = 'th' if in_thead else 'td'
+            emit('<tr>\n')
             for cell in cells:
-                cell_html = inline_format(cell)
-                html_lines.append(f'<{row_tag}>{cell_html}</{row_tag}>')
-            html_lines.append('</tr>')
-            i += 1
+                cell_html = inline(cell)
+                emit(f'<{row_tag}>{cell_html}</{row_tag}>\n')
+            emit('</tr>\n')
             continue
         elif in_table:
             in_table = False
-            html_lines.append('</tbody>')
-            html_lines.append('</table>')
+            emit('</tbody>\n</table>\n')
         
         # 空行
-        if not line.strip():
+        if not c:
             if in_list:
                 in_list = False
-                html_lines.append(f'</{list_type}>')
-            html_lines.append('')
-            i += 1
+                emit(f'</{list_type}>\n')
+            emit('\n')
             continue
         
         # 标题
-        if line.startswith('#'):
+        if line[0] == '#':
             if in_list:
                 in_list = False
-                html_lines.append(f'</{list_type}>')
-            level = len(re.match(r'^#+', line).group())
+                emit(f'</{list_type}>\n')
+            level = len(match_heading(line).group())
             text = line[level:].strip()
-            text_html = inline_format(text)
-            anchor = re.sub(r'[^\w\s-]', '', text.lower()).replace(' ', '-')
-            html_lines.append(f'<h{level} id="{anchor}">{text_html}</h{level}>')
-            i += 1
+            text_html = inline(text)
+            anchor = anchors.get(text)
+            if anchor is None:
+                anchor = anchors[text] = make_anchor(text)
+            emit(f'<h{level} id="{anchor}">{text_html}</h{level}>\n')
+            if toc is not None:
+                toc.append((level, _RE_TAG.sub('', text_html), anchor))
             continue
         
-        # 无序列表
-        if re.match(r'^[-*]\s', line.strip()):
-            if not in_list or list_type != 'ul':
+        # 列表项（按字符判断，不走正则）
+        new_type = None
+        if c in '-*' and stripped[1:2].isspace():
+            new_type = 'ul'
+            text = stripped[2:]
+        elif c.isdecimal():
+            j = 1
+            while j < len(stripped) and stripped[j].isdecimal():
+                j += 1
+            if stripped[j:j + 1] == '.' and stripped[j + 1:j + 2].isspace():
+                new_type = 'ol'
+                text = stripped[j + 2:]
+        if new_type:
+            if not in_list or list_type != new_type:
                 if in_list:
-                    html_lines.append(f'</{list_type}>')
+                    emit(f'</{list_type}>\n')
                 in_list = True
-                list_type = 'ul'
-                html_lines.append('<ul>')
-            text = re.sub(r'^[-*]\s', '', line.strip())
-            html_lines.append(f'<li>{inline_format(text)}</li>')
-            i += 1
-            continue
-        
-        # 有序列表
-        if re.match(r'^\d+\.\s', line.strip()):
-            if not in_list or list_type != 'ol':
-                if in_list:
-                    html_lines.append(f'</{list_type}>')
-                in_list = True
-                list_type = 'ol'
-                html_lines.append('<ol>')
-            text = re.sub(r'^\d+\.\s', '', line.strip())
-            html_lines.append(f'<li>{inline_format(text)}</li>')
-            i += 1
+                list_type = new_type
+                emit(f'<{new_type}>\n')
+            emit(f'<li>{inline(text)}</li>\n')
             continue
         
         # 分隔线
-        if re.match(r'^[-*_]{3,}$', line.strip()):
-            html_lines.append('<hr>')
-            i += 1
+        if len(stripped) >= 3 and not stripped.strip('-*_'):
+            emit('<hr>\n')
             continue
         
         # 段落
         if in_list:
             in_list = False
-            html_lines.append(f'</{list_type}>')
-        html_lines.append(f'<p>{inline_format(line)}</p>')
-        i += 1
+            emit(f'</{list_type}>\n')
+        emit(f'<p>{inline(line)}</p>\n')
     
+    # 没有闭合围栏的代码块，其后所有行都属于代码块
+    if code_lines:
+        emit(escape('\n'.join(code_lines) + '\n'))
     if in_list:
-        html_lines.append(f'</{list_type}>')
+        emit(f'</{list_type}>\n')
     if in_table:
-        html_lines.append('</tbody>')
-        html_lines.append('</table>')
+        emit('</tbody>\n</table>\n')
     
-    return '\n'.join(html_lines)
-
-def inline_format(text):
-    """处理行内格式"""
+    return buf.getvalue()
+
+# 能触发行内格式的字符（图片以 '![' 开头，也包含 '['），不含这些字符的文本无需匹配
+_INLINE_MARKERS = frozenset('*_`[')
+
+def _inline_repl(m):
+    """根据命中的分组生成对应的行内 HTML"""
+    kind = m.lastgroup
+    idx = m.lastindex
+    if kind == 'img':
+        return f'<img src="{m.group(idx + 2)}" alt="{m.group(idx + 1)}">'
+    if kind == 'link':
+        return f'<a href="{m.group(idx + 2)}">{inline_format(m.group(idx + 1))}</a>'
+    if kind == 'code':
+        return f'<code>{m.group(idx + 1)}</code>'
+    if kind in ('strong_em_star', 'strong_em_under'):
+        return f'<strong><em>{inline_format(m.group(idx + 1))}</em></strong>'
+    if kind in ('bold_star', 'bold_under'):
+        return f'<strong>{inline_format(m.group(idx + 1))}</strong>'
+    return f'<em>{inline_format(m.group(idx + 1))}</em>'
+
+def inline_format(text, _isdisjoint=_INLINE_MARKERS.isdisjoint,
+                  _sub=_RE_INLINE.sub, _repl=_inline_repl):
+    """处理行内格式（粗体、斜体、行内代码、链接、图片）
+
+    下划线开头的参数在定义时绑定，调用时按局部变量访问，不要传入。
+
+    >>> inline_format('*a **b** c*')
+    '<em>a <strong>b</strong> c</em>'
+    >>> inline_format('***x***')
+    '<strong><em>x</em></strong>'
+    """
     # 转义 HTML
     # text = escape_html(text)  # 暂时不转义，因为可能包含链接等
-    
-    # 粗体
-    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-    text = re.sub(r'__(.+?)__', r'<strong>\1</strong>', text)
-    
-    # 斜体
-    text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
-    text = re.sub(r'_(.+?)_', r'<em>\1</em>', text)
-    
-    # 行内代码
-    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
-    
-    # 链接
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
-    
-    # 图片（徽章等）
-    text = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', r'<img src="\2" alt="\1">', text)
-    
-    return text
-
-def generate_html_page(title, content, css):
-    """生成完整的 HTML 页面"""
-    return f'''<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-{css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <nav class="sidebar">
-            <div class="sidebar-header">
-                <h2>📖 导航</h2>
-            </div>
-            <div class="sidebar-content" id="toc">
-            </div>
-        </nav>
-        <main class="content">
-{content}
-        </main>
-    </div>
-    <script>
-        // 生成目录
-        document.addEventListener('DOMContentLoaded', function() {{
-            const toc = document.getElementById('toc');
-            const headings = document.querySelectorAll('h1, h2, h3');
-            let tocHtml = '<ul>';
-            headings.forEach(function(heading) {{
-                const level = parseInt(heading.tagName.charAt(1));
-                const text = heading.textContent;
-                const id = heading.id;
-                const indent = (level - 1) * 15;
-                tocHtml += `<li style="margin-left: ${{indent}}px"><a href="#${{id}}">${{text}}</a></li>`;
-            }});
-            tocHtml += '</ul>';
-            toc.innerHTML = tocHtml;
-        }});
-    </script>
-</body>
-</html>'''
+    if _isdisjoint(text):
+        return text
+    return _sub(_repl, text)
+
+if mistune is not None:
+    def _heading_anchor_hook(md, state):
+        """渲染前按标题的原始 Markdown 文本生成锚点和目录文本
+
+        与内置解析器使用同一来源，保证两种后端生成的锚点和目录一致。
+        """
+        tokens = list(state.tokens)
+        while tokens:
+            tok = tokens.pop()
+            if tok['type'] == 'heading' and 'text' in tok:
+                text = tok['text'].strip()
+                tok['attrs']['anchor'] = make_anchor(text)
+                tok['attrs']['toc_text'] = _RE_TAG.sub('', inline_format(text))
+            tokens.extend(tok.get('children', ()))
+
+    class _AnchoredHTMLRenderer(mistune.HTMLRenderer):
+        """为标题加上与内置解析器一致的锚点 ID，并按需收集目录项"""
+
+        toc = None
+
+        def heading(self, text, level, anchor='', toc_text='', **attrs):
+            if self.toc is not None:
+                self.toc.append((level, toc_text, anchor))
+            return f'<h{level} id="{anchor}">{text}</h{level}>\n'
+
+    _MISTUNE = mistune.create_markdown(
+        renderer=_AnchoredHTMLRenderer(escape=False),
+        plugins=['table', 'strikethrough'],
+    )
+    _MISTUNE.before_render_hooks.append(_heading_anchor_hook)
+else:
+    _MISTUNE = None
+
+def markdown_to_html(md_content, toc=None):
+    """Markdown 到 HTML 转换，优先使用 mistune，否则使用内置解析器
+
+    传入 toc 列表时，会依次追加每个标题的 (level, text, anchor)。
+    """
+    if _MISTUNE is not None:
+        renderer = _MISTUNE.renderer
+        renderer.toc = toc
+        try:
+            content = _MISTUNE(md_content)
+        finally:
+            renderer.toc = None
+        return content.replace('<table>', '<table class="table">')
+    return _markdown_to_html_builtin(md_content, toc)
 
 CSS = '''
 :root {
@@ -445,6 +544,134 @@ blockquote {
 }
 '''
 
+# 页面外壳在模块加载时拼好，生成页面时只需拼接标题和正文
+_PAGE_TITLE_OPEN = '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>'''
+
+_PAGE_STYLE_OPEN = '''</title>
+    <style>
+'''
+
+_PAGE_BODY_OPEN = '''
+    </style>
+</head>
+<body>
+    <div class="container">
+        <nav class="sidebar">
+            <div class="sidebar-header">
+                <h2>📖 导航</h2>
+            </div>
+            <div class="sidebar-content" id="toc">
+'''
+
+_PAGE_CONTENT_OPEN = '''
+            </div>
+        </nav>
+        <main class="content">
+'''
+
+_PAGE_TAIL = '''
+        </main>
+    </div>
+</body>
+</html>'''
+
+_PAGE_AFTER_TITLE = _PAGE_STYLE_OPEN + CSS + _PAGE_BODY_OPEN
+
+# 侧边栏目录只收录 h1 ~ h3
+_TOC_MAX_LEVEL = 3
+# 各级标题在目录中的缩进，按 level - 1 索引
+_TOC_INDENT = tuple(f'{(level - 1) * 15}px' for level in range(1, 7))
+
+def generate_toc(toc):
+    """根据 markdown_to_html 收集的标题生成侧边栏目录"""
+    items = ''.join(
+        f'<li style="margin-left: {_TOC_INDENT[level - 1]}"><a href="#{anchor}">{text}</a></li>'
+        for level, text, anchor in toc
+        if level <= _TOC_MAX_LEVEL
+    )
+    return f'<ul>{items}</ul>'
+
+def generate_html_page(title, content, css=CSS, toc=()):
+    """生成完整的 HTML 页面"""
+    after_title = _PAGE_AFTER_TITLE if css == CSS else _PAGE_STYLE_OPEN + css + _PAGE_BODY_OPEN
+    return ''.join((
+        _PAGE_TITLE_OPEN, title, after_title,
+        generate_toc(toc), _PAGE_CONTENT_OPEN,
+        content, _PAGE_TAIL,
+    ))
+
+# 生成结果缓存：输出目录下的 .cache/<name>.sha256 记录上次生成时的摘要，
+# 摘要覆盖源文本、标题、本脚本内容和解析后端，任何一项变化都会重新生成。
+# 需要强制重新生成时删除 .cache 目录即可。
+_CACHE_DIR_NAME = '.cache'
+# 使用 mistune 时计入其版本号，升级 mistune 后渲染结果可能变化
+_PARSER_BACKEND = f'mistune {mistune.__version__}' if mistune is not None else 'builtin'
+_GENERATOR_DIGEST = hashlib.sha256(
+    Path(__file__).read_bytes() + _PARSER_BACKEND.encode('utf-8')
+).hexdigest()
+
+def _content_digest(md_content, title):
+    """计算一次文档生成的缓存摘要"""
+    h = hashlib.sha256(_GENERATOR_DIGEST.encode('ascii'))
+    h.update(title.encode('utf-8'))
+    h.update(b'\0')
+    h.update(md_content.encode('utf-8'))
+    return h.hexdigest()
+
+def convert_document(md_content, output_path, title):
+    """将 Markdown 文本转换为完整的 HTML 页面并写入 output_path
+
+    返回 (output_path, updated)；内容与上次生成时一致且输出文件仍在时跳过转换，
+    updated 为 False。
+    """
+    output_path = Path(output_path)
+    cache_path = output_path.parent / _CACHE_DIR_NAME / f'{output_path.stem}.sha256'
+    digest = _content_digest(md_content, title)
+    if output_path.exists() and cache_path.exists() \
+            and cache_path.read_text(encoding='ascii') == digest:
+        return output_path, False
+    
+    toc = []
+    html_content = markdown_to_html(md_content, toc)
+    html_page = generate_html_page(title, html_content, CSS, toc)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html_page)
+    
+    cache_path.parent.mkdir(exist_ok=True)
+    cache_path.write_text(digest, encoding='ascii')
+    return output_path, True
+
+def read_markdown(input_path):
+    """读取 Markdown 文件
+
+    通过 mmap 映射文件后直接解码，省去 f.read() 产生的中间 bytes 副本；
+    换行符按文本模式的规则统一为 '\\n'。
+    """
+    with open(input_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            md_content = str(mm, 'utf-8')
+    if '\r' in md_content:
+        md_content = md_content.replace('\r\n', '\n').replace('\r', '\n')
+    return md_content
+
+def convert_file(input_path, output_path, title):
+    """读取 Markdown 文件并转换为 HTML 页面"""
+    return convert_document(read_markdown(input_path), output_path, title)
+
+def report_result(output_path, updated):
+    """打印单个文档的转换结果"""
+    if updated:
+        print(f"  ✓ 已生成: {output_path}")
+    else:
+        print(f"  - 未变化，跳过: {output_path}")
+
 def main():
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
@@ -453,31 +680,10 @@ def main():
     # 创建输出目录
     docs_output.mkdir(parents=True, exist_ok=True)
     
-    # 转换 README.md
-    readme_path = project_root / 'README.md'
-    if readme_path.exists():
-        print(f"正在转换: {readme_path}")
-        with open(readme_path, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        html_content = markdown_to_html(md_content)
-        html_page = generate_html_page('ChainGraph - README', html_content, CSS)
-        output_path = docs_output / 'README.html'
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_page)
-        print(f"  ✓ 已生成: {output_path}")
-    
-    # 转换 manual.md
-    manual_path = project_root / 'docs' / 'manual.md'
-    if manual_path.exists():
-        print(f"正在转换: {manual_path}")
-        with open(manual_path, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        html_content = markdown_to_html(md_content)
-        html_page = generate_html_page('ChainGraph - 产品手册', html_content, CSS)
-        output_path = docs_output / 'manual.html'
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_page)
-        print(f"  ✓ 已生成: {output_path}")
+    sources = [
+        (project_root / 'README.md', docs_output / 'README.html', 'ChainGraph - README'),
+        (project_root / 'docs' / 'manual.md', docs_output / 'manual.html', 'ChainGraph - 产品手册'),
+    ]
     
     # 创建首页索引
     index_content = '''
@@ -502,12 +708,13 @@ def main():
 
 *ChainGraph - 专为 Web3 设计的高性能图数据库*
 '''
-    html_content = markdown_to_html(index_content)
-    html_page = generate_html_page('ChainGraph 文档中心', html_content, CSS)
-    output_path = docs_output / 'index.html'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_page)
-    print(f"  ✓ 已生成: {output_path}")
+    
+    # 逐个转换：三份文档总共只需约 10 ms，启动进程池的开销反而更大
+    for input_path, output_path, title in sources:
+        if input_path.exists():
+            print(f"正在转换: {input_path}")
+            report_result(*convert_file(input_path, output_path, title))
+    report_result(*convert_document(index_content, docs_output / 'index.html', 'ChainGraph 文档中心'))
     
     print("\n文档生成完成！")
     print(f"文档目录: {docs_output}")